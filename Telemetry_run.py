@@ -2,9 +2,9 @@ import arcade
 import arcade.gui
 from arcade.gui import widgets
 import data_loader
+import race_replay
 import fastf1.plotting
 import pandas as pd
-import math
 
 # Enable FastF1 plotting
 fastf1.plotting.setup_mpl(misc_mpl_mods=False)
@@ -79,23 +79,11 @@ class RaceView(arcade.View):
         self.session = data_loader.load_race_data(self.year, self.event_name)
         if self.session:
             self.session.load()
-            all_telemetry = []
-            # Process all drivers
-            drivers_to_process = self.session.drivers
-            for driver_number in drivers_to_process:
-                try:
-                    laps = self.session.laps.pick_driver(driver_number)
-                    telemetry = laps.get_telemetry().add_distance()
-                    if not telemetry.empty:
-                        # Sample every 5th point for smooth animation while maintaining performance
-                        sampled_telemetry = telemetry.iloc[::5].copy()
-                        self.driver_telemetry[driver_number] = sampled_telemetry
-                        all_telemetry.append(sampled_telemetry)
-                except Exception:
-                    pass
-
-            if all_telemetry:
-                full_telemetry_df = pd.concat(all_telemetry)
+            # Sample every 5th point for smooth animation while maintaining performance
+            self.driver_telemetry = race_replay.load_driver_telemetry(self.session)
+
+            if self.driver_telemetry:
+                full_telemetry_df = pd.concat(self.driver_telemetry.values())
                 self.x_min, self.x_max = full_telemetry_df['X'].min(), full_telemetry_df['X'].max()
                 self.y_min, self.y_max = full_telemetry_df['Y'].min(), full_telemetry_df['Y'].max()
                 self.total_race_time = full_telemetry_df['Time'].max()
@@ -140,20 +128,16 @@ class RaceView(arcade.View):
         # Draw track boundaries
         self._draw_track_boundaries()
         
+        scale, offset_x, offset_y = race_replay.screen_transform(self.x_min, self.x_max, self.y_min, self.y_max, SCREEN_WIDTH, SCREEN_HEIGHT)
         for driver_number, telemetry in self.driver_telemetry.items():
             if 'Time' not in telemetry.columns: continue
             
-            time_diff = (telemetry['Time'] - self.race_time).abs()
-            closest_sample = telemetry.loc[time_diff.idxmin()]
+            closest_sample = race_replay.closest_sample(telemetry, self.race_time)
             x, y = closest_sample['X'], closest_sample['Y']
-            
-            scale = min((SCREEN_WIDTH-200)/(self.x_max-self.x_min), (SCREEN_HEIGHT-200)/(self.y_max-self.y_min)) if self.x_max > self.x_min and self.y_max > self.y_min else 1
-            offset_x = (SCREEN_WIDTH - (self.x_max - self.x_min) * scale) / 2
-            offset_y = (SCREEN_HEIGHT - (self.y_max - self.y_min) * scale) / 2
             screen_x, screen_y = (x - self.x_min) * scale + offset_x, (y - self.y_min) * scale + offset_y
 
             driver = self.session.get_driver(driver_number)
-            team_color_hex = fastf1.plotting.get_team_color(driver['TeamName'], session=self.session) or "#FFFFFF"
+            team_color_hex = race_replay.team_color(self.session, driver_number)
             arcade.draw_circle_filled(screen_x, screen_y, 7, hex_to_rgb(team_color_hex))
             arcade.draw_text(driver['Abbreviation'], screen_x + 10, screen_y, arcade.color.WHITE, 10)
 
@@ -161,58 +145,16 @@ class RaceView(arcade.View):
 
     def _create_track_boundaries(self):
         """Create two boundary lines for the track."""
-        try:
-            # Get the fastest lap
-            fastest_lap = self.session.laps.pick_fastest()
-            if fastest_lap is not None:
-                telemetry = fastest_lap.get_telemetry().add_distance()
-                if not telemetry.empty:
-                    self.track_left_boundary = []
-                    self.track_right_boundary = []
-                    track_width = 250  # Adjust this value to change the track width
-
-                    points = list(zip(telemetry['X'], telemetry['Y']))
-                    for i in range(len(points)):
-                        p1 = points[i]
-                        p2 = points[(i + 1) % len(points)]
-
-                        # Calculate direction vector
-                        dx = p2[0] - p1[0]
-                        dy = p2[1] - p1[1]
-
-                        # Normalize direction vector
-                        length = math.sqrt(dx**2 + dy**2)
-                        if length > 0:
-                            dx /= length
-                            dy /= length
-
-                        # Calculate perpendicular vector
-                        perp_dx = -dy
-                        perp_dy = dx
-
-                        # Calculate boundary points
-                        left_point = (p1[0] + perp_dx * track_width, p1[1] + perp_dy * track_width)
-                        right_point = (p1[0] - perp_dx * track_width, p1[1] - perp_dy * track_width)
-
-                        self.track_left_boundary.append(left_point)
-                        self.track_right_boundary.append(right_point)
-
-        except Exception as e:
-            print(f"Error creating track boundaries: {e}")
-            self.track_left_boundary = []
-            self.track_right_boundary = []
+        self.track_left_boundary, self.track_right_boundary = race_replay.create_track_boundaries(self.session)
 
     def _scale_track_boundaries(self):
         """Scale the track boundaries to fit the screen."""
         if not self.track_left_boundary or not self.track_right_boundary:
             return
         
-        if self.x_max > self.x_min and self.y_max > self.y_min:
-            scale = min((SCREEN_WIDTH-200)/(self.x_max-self.x_min), (SCREEN_HEIGHT-200)/(self.y_max-self.y_min))
-            offset_x = (SCREEN_WIDTH - (self.x_max - self.x_min) * scale) / 2
-            offset_y = (SCREEN_HEIGHT - (self.y_max - self.y_min) * scale) / 2
-        else:
+        if not (self.x_max > self.x_min and self.y_max > self.y_min):
             return
+        scale, offset_x, offset_y = race_replay.screen_transform(self.x_min, self.x_max, self.y_min, self.y_max, SCREEN_WIDTH, SCREEN_HEIGHT)
             
         self.scaled_left_boundary_points = [((x - self.x_min) * scale + offset_x, (y - self.y_min) * scale + offset_y) for x, y in self.track_left_boundary]
         self.scaled_right_boundary_points = [((x - self.x_min) * scale + offset_x, (y - self.y_min) * scale + offset_y) for x, y in self.track_right_boundary]
@@ -225,26 +167,8 @@ class RaceView(arcade.View):
 
     def _draw_positions(self):
         """Draw the driver positions on the right side of the screen."""
-        # Create a list of drivers with their current distance
-        driver_positions = []
-        for driver_number, telemetry in self.driver_telemetry.items():
-            if 'Time' not in telemetry.columns: continue
-            
-            time_diff = (telemetry['Time'] - self.race_time).abs()
-            closest_sample = telemetry.loc[time_diff.idxmin()]
-            distance = closest_sample['Distance']
-            
-            laps = self.session.laps.pick_driver(driver_number)
-            current_laps = laps[laps['Time'] < self.race_time]
-            if not current_laps.empty:
-                lap_number = current_laps.iloc[-1]['LapNumber']
-            else:
-                lap_number = 1
-            
-            driver_positions.append({'driver_number': driver_number, 'distance': distance, 'lap_number': lap_number})
-
-        # Sort drivers by distance
-        driver_positions.sort(key=lambda x: x['distance'], reverse=True)
+        # Drivers sorted by their current distance
+        driver_positions = race_replay.driver_standings(self.session, self.driver_telemetry, self.race_time)
 
         # Draw background
         arcade.draw_lbwh_rectangle_filled(SCREEN_WIDTH - 200, 0, 200, SCREEN_HEIGHT, (0, 0, 0, 150))
@@ -253,7 +177,7 @@ class RaceView(arcade.View):
         y_pos = SCREEN_HEIGHT - 30
         for i, pos_data in enumerate(driver_positions):
             driver = self.session.get_driver(pos_data['driver_number'])
-            team_color_hex = fastf1.plotting.get_team_color(driver['TeamName'], session=self.session) or "#FFFFFF"
+            team_color_hex = race_replay.team_color(self.session, pos_data['driver_number'])
             
             arcade.draw_text(f"{i+1}", SCREEN_WIDTH - 180, y_pos, arcade.color.WHITE, 14)
             arcade.draw_lbwh_rectangle_filled(SCREEN_WIDTH - 160, y_pos + 7, 10, 10, hex_to_rgb(team_color_hex))
@@ -1,4 +1,4 @@
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, jsonify, request, send_from_directory
 from flask_cors import CORS
 import os
 from web_telemetry_provider import WebTelemetryProvider
@@ -71,5 +71,74 @@ def get_lap_start_time(year, event_name, lap_number):
         return jsonify(lap_time_data)
     return jsonify({'error': 'Could not load lap start time'}), 404
 
+@app.route('/api/race/<int:year>/<event_name>/battles', methods=['GET'])
+def get_battles(year, event_name):
+    from urllib.parse import unquote
+    event_name = unquote(event_name)
+    max_distance = request.args.get('distance', None, type=float)
+    # Time gaps are ignored with gap=none, or when only a distance is given
+    gap = request.args.get('gap')
+    if gap is None:
+        max_gap_seconds = 1.0 if max_distance is None else None
+    elif gap.strip().lower() in ('', 'none'):
+        max_gap_seconds = None
+    else:
+        try:
+            max_gap_seconds = float(gap)
+        except ValueError:
+            return jsonify({'error': 'gap must be a number of seconds or none'}), 400
+    battles = telemetry_provider.get_battles(
+        year, event_name,
+        max_gap_seconds=max_gap_seconds,
+        max_distance=max_distance,
+        min_duration=request.args.get('min_duration', 5.0, type=float)
+    )
+    if battles is not None:
+        return jsonify(battles)
+    return jsonify({'error': 'Could not load battles'}), 404
+
+@app.route('/api/race/<int:year>/<event_name>/overtakes', methods=['GET'])
+def get_overtakes(year, event_name):
+    from urllib.parse import unquote
+    event_name = unquote(event_name)
+    overtakes = telemetry_provider.get_overtakes(year, event_name)
+    if overtakes is not None:
+        return jsonify(overtakes)
+    return jsonify({'error': 'Could not load overtakes'}), 404
+
+def parse_lap_specs():
+    # Each lap is passed as ?lap=<year>,<event name>,<driver>,<lap number or 'fastest'>
+    lap_specs = []
+    for value in request.args.getlist('lap'):
+        parts = value.split(',')
+        if len(parts) != 4:
+            return None
+        year, event_name, driver, lap_number = (part.strip() for part in parts)
+        if not year.isdigit() or not (lap_number.isdigit() or lap_number == 'fastest'):
+            return None
+        lap_specs.append((int(year), event_name, driver, lap_number))
+    return lap_specs or None
+
+@app.route('/api/compare', methods=['GET'])
+def compare_laps():
+    lap_specs = parse_lap_specs()
+    if lap_specs is None:
+        return jsonify({'error': 'Expected one or more lap=<year>,<event>,<driver>,<lap> parameters'}), 400
+    comparison = telemetry_provider.compare_laps(lap_specs)
+    if comparison is not None:
+        return jsonify(comparison)
+    return jsonify({'error': 'Could not compare laps'}), 404
+
+@app.route('/api/compare/ghosts', methods=['GET'])
+def get_ghost_positions():
+    lap_specs = parse_lap_specs()
+    lap_time = request.args.get('time', 0.0, type=float)
+    if lap_specs is None:
+        return jsonify({'error': 'Expected one or more lap=<year>,<event>,<driver>,<lap> parameters'}), 400
+    positions = telemetry_provider.get_ghost_positions(lap_specs, lap_time)
+    if positions is not None:
+        return jsonify(positions)
+    return jsonify({'error': 'Could not load ghost positions'}), 404
+
 if __name__ == '__main__':
     app.run(host='127.0.0.1', port=5000, debug=True)
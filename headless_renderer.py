@@ -0,0 +1,327 @@
+import argparse
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import matplotlib.image
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+
+import data_loader
+import race_replay
+
+DPI = 72  # One point per pixel, so sizes match the arcade viewer
+SIDEBAR_WIDTH = 200
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.mov', '.avi')
+
+
+class ReplayTimeline:
+    """
+    Driver positions and standings for many race times at once.
+
+    This is the vectorized form of race_replay.closest_sample,
+    race_replay.lap_number_at and race_replay.driver_standings, so a whole
+    export is resolved with a few array lookups instead of per-frame
+    DataFrame scans.
+    """
+
+    def __init__(self, session, driver_telemetry: dict):
+        self.drivers = [d for d, t in driver_telemetry.items() if 'Time' in t.columns and not t.empty]
+        self.abbreviations = [session.get_driver(d)['Abbreviation'] for d in self.drivers]
+        self.colors = [race_replay.team_color(session, d) for d in self.drivers]
+
+        self._samples = []
+        self._laps = []
+        for driver_number in self.drivers:
+            telemetry = driver_telemetry[driver_number]
+            self._samples.append((
+                telemetry['Time'].dt.total_seconds().to_numpy(dtype=float),
+                telemetry['X'].to_numpy(dtype=float),
+                telemetry['Y'].to_numpy(dtype=float),
+                telemetry['Distance'].to_numpy(dtype=float),
+            ))
+            laps = session.laps.pick_driver(driver_number).dropna(subset=['Time'])
+            offset = race_replay.session_time_offset(telemetry).total_seconds()
+            self._laps.append((
+                laps['Time'].dt.total_seconds().to_numpy(dtype=float) - offset,
+                laps['LapNumber'].to_numpy(dtype=float),
+            ))
+
+    def sample(self, race_times: np.ndarray):
+        """
+        Resolves every driver at every race time.
+
+        Returns:
+            A (x, y, distance, lap_number) tuple of arrays shaped (frames, drivers).
+        """
+        shape = (len(race_times), len(self.drivers))
+        x, y, distance = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+        lap_number = np.ones(shape, dtype=int)
+
+        for i, (t, sx, sy, sd) in enumerate(self._samples):
+            # Nearest sample, taking the earlier one on ties like idxmin does
+            right = np.clip(np.searchsorted(t, race_times), 0, len(t) - 1)
+            left = np.clip(right - 1, 0, len(t) - 1)
+            nearest = np.where(np.abs(t[right] - race_times) < np.abs(t[left] - race_times), right, left)
+            x[:, i], y[:, i], distance[:, i] = sx[nearest], sy[nearest], sd[nearest]
+
+            lap_times, lap_numbers = self._laps[i]
+            completed = np.searchsorted(lap_times, race_times, side='left')
+            has_lap = completed > 0
+            lap_number[has_lap, i] = lap_numbers[completed[has_lap] - 1]
+
+        return x, y, distance, lap_number
+
+
+def _create_figure(scene: dict):
+    """
+    Builds the figure once per worker.
+
+    Everything that does not move is drawn here and kept as a background
+    image. The returned artists are animated, so each frame only redraws
+    them on top of that background.
+    """
+    width, height = scene['width'], scene['height']
+    figure = Figure(figsize=(width / DPI, height / DPI), dpi=DPI, facecolor='black')
+    FigureCanvasAgg(figure)
+    axes = figure.add_axes((0, 0, 1, 1))
+    axes.set_xlim(0, width)
+    axes.set_ylim(0, height)
+    axes.set_facecolor('black')
+    axes.axis('off')
+
+    for boundary in (scene['left_boundary'], scene['right_boundary']):
+        if len(boundary):
+            axes.plot(boundary[:, 0], boundary[:, 1], color='white', linewidth=2)
+
+    artists = {
+        'time': axes.text(width / 2, height - 60, '', color='white', fontsize=20, ha='center', animated=True),
+        'cars': axes.scatter(np.zeros(len(scene['colors'])), np.zeros(len(scene['colors'])), s=14 ** 2,
+                             c=scene['colors'], zorder=3, animated=True),
+        'labels': [axes.text(0, 0, abbreviation, color='white', fontsize=10, zorder=4, animated=True)
+                   for abbreviation in scene['abbreviations']],
+    }
+    axes.text(width / 2, height - 30, scene['title'], color='white', fontsize=20, ha='center')
+    axes.text(width - 100, height - 80, f"Speed: {scene['speed']:.1f}x", color='white', fontsize=16)
+
+    # Leaderboard rows are drawn once and relabelled every frame
+    axes.add_patch(Rectangle((width - SIDEBAR_WIDTH, 0), SIDEBAR_WIDTH, height, color=(0, 0, 0, 150 / 255), zorder=5))
+    artists['rows'] = []
+    for i in range(len(scene['abbreviations'])):
+        y_pos = height - 30 - 30 * i
+        axes.text(width - 180, y_pos, f"{i+1}", color='white', fontsize=14, zorder=6)
+        swatch = Rectangle((width - 160, y_pos + 7), 10, 10, zorder=6, animated=True)
+        axes.add_patch(swatch)
+        name = axes.text(width - 140, y_pos, '', color='white', fontsize=14, zorder=6, animated=True)
+        artists['rows'].append((swatch, name))
+
+    figure.canvas.draw()
+    artists['background'] = figure.canvas.copy_from_bbox(figure.bbox)
+    return figure, axes, artists
+
+
+def _render_chunk(scene: dict, chunk: dict, output_dir: str, video: bool) -> str:
+    """Renders one chunk of frames to PNG files, or to a video segment."""
+    figure, axes, artists = _create_figure(scene)
+    encoder = None
+    if video:
+        frame_width, frame_height = figure.canvas.get_width_height()
+        path = os.path.join(output_dir, f"chunk_{chunk['index']:05d}.mp4")
+        encoder = subprocess.Popen([
+            'ffmpeg', '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{frame_width}x{frame_height}', '-r', str(scene['fps']), '-i', '-',
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p', path,
+        ], stdin=subprocess.PIPE)
+    else:
+        path = output_dir
+
+    try:
+        for f, frame_number in enumerate(chunk['frame_numbers']):
+            artists['time'].set_text(f"Time: {str(pd.Timedelta(seconds=chunk['race_times'][f])).split('.')[0]}")
+            artists['cars'].set_offsets(np.column_stack((chunk['x'][f], chunk['y'][f])))
+            for label, x, y in zip(artists['labels'], chunk['x'][f], chunk['y'][f]):
+                label.set_position((x + 10, y))
+            for (swatch, name), driver in zip(artists['rows'], chunk['order'][f]):
+                swatch.set_facecolor(scene['colors'][driver])
+                name.set_text(f"{scene['abbreviations'][driver]} - Lap {chunk['laps'][f][driver]}")
+
+            figure.canvas.restore_region(artists['background'])
+            for artist in [artists['cars'], artists['time'], *artists['labels'], *(a for row in artists['rows'] for a in row)]:
+                axes.draw_artist(artist)
+            if encoder:
+                encoder.stdin.write(figure.canvas.buffer_rgba())
+            else:
+                matplotlib.image.imsave(os.path.join(output_dir, f"frame_{frame_number:06d}.png"),
+                                        np.asarray(figure.canvas.buffer_rgba()))
+    except BaseException:
+        # Don't leave ffmpeg waiting on an open pipe when a frame fails
+        if encoder:
+            encoder.kill()
+            encoder.stdin.close()
+            encoder.wait()
+        raise
+
+    if encoder:
+        encoder.stdin.close()
+        if encoder.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed to encode {path}")
+    return path
+
+
+def render_replay(year: int, event_name: str, output: str, start: float = 0.0, end: float = None,
+                  fps: int = 30, speed: float = 1.0, width: int = 1280, height: int = 720,
+                  workers: int = None, chunk_frames: int = None):
+    """
+    Renders a race replay without a display.
+
+    Frames are split into chunks and rendered across a process pool. Each
+    worker draws its chunk with matplotlib's Agg backend, reusing one
+    figure for all its frames.
+
+    Args:
+        year: The year of the event.
+        event_name: The name of the event (e.g., 'Italian Grand Prix').
+        output: A directory for a PNG sequence, or a video file (.mp4, .mkv, .mov, .avi).
+        start: Race time in seconds of the first frame.
+        end: Race time in seconds of the last frame, or None for the end of the race.
+        fps: Frames per second of the output.
+        speed: Race seconds per second of output, e.g. 20 renders 2 hours in 6 minutes.
+        width: Frame width in pixels.
+        height: Frame height in pixels.
+        workers: Number of processes, or None for one per CPU.
+        chunk_frames: Frames per chunk, or None to give each worker a few chunks.
+
+    Returns:
+        The output path, or None if the race could not be rendered.
+    """
+    if fps <= 0 or speed <= 0:
+        print(f"fps and speed must be positive, got fps={fps} and speed={speed}")
+        return None
+    if width <= 0 or height <= 0:
+        print(f"Frame size must be positive, got {width}x{height}")
+        return None
+
+    video = output.lower().endswith(VIDEO_EXTENSIONS)
+    if video and shutil.which('ffmpeg') is None:
+        print("ffmpeg is required for video output")
+        return None
+
+    if end is not None and start >= end:
+        print(f"Nothing to render: start {start}s is not before end {end}s")
+        return None
+
+    session = data_loader.load_race_data(year, event_name)
+    if session is None:
+        return None
+    driver_telemetry = race_replay.load_driver_telemetry(session)
+    if not driver_telemetry:
+        print(f"No telemetry available for {year} {event_name}")
+        return None
+
+    full_telemetry_df = pd.concat(driver_telemetry.values())
+    x_min, x_max = full_telemetry_df['X'].min(), full_telemetry_df['X'].max()
+    y_min, y_max = full_telemetry_df['Y'].min(), full_telemetry_df['Y'].max()
+    if end is None:
+        end = full_telemetry_df['Time'].max().total_seconds()
+        if start >= end:
+            print(f"Nothing to render: start {start}s is after the race ends at {end:.0f}s")
+            return None
+    scale, offset_x, offset_y = race_replay.screen_transform(x_min, x_max, y_min, y_max, width, height)
+
+    def to_screen(x, y):
+        return (x - x_min) * scale + offset_x, (y - y_min) * scale + offset_y
+
+    left_boundary, right_boundary = race_replay.create_track_boundaries(session)
+    timeline = ReplayTimeline(session, driver_telemetry)
+    scene = {
+        'width': width,
+        'height': height,
+        'fps': fps,
+        'speed': speed,
+        'title': f"Race: {year} {event_name}",
+        'abbreviations': timeline.abbreviations,
+        'colors': timeline.colors,
+        'left_boundary': np.array([to_screen(x, y) for x, y in left_boundary]).reshape(-1, 2),
+        'right_boundary': np.array([to_screen(x, y) for x, y in right_boundary]).reshape(-1, 2),
+    }
+
+    race_times = np.arange(start, end, speed / fps)
+    if not len(race_times):
+        print(f"Nothing to render between {start}s and {end}s")
+        return None
+    x, y, distance, lap_number = timeline.sample(race_times)
+    x, y = to_screen(x, y)
+    # Stable sort keeps the driver order for ties, like list.sort in driver_standings
+    order = np.argsort(-distance, axis=1, kind='stable')
+
+    workers = workers or os.cpu_count() or 1
+    chunk_frames = chunk_frames or max(1, math.ceil(len(race_times) / (workers * 4)))
+    chunks = [{
+        'index': c,
+        'frame_numbers': range(i, min(i + chunk_frames, len(race_times))),
+        'race_times': race_times[i:i + chunk_frames],
+        'x': x[i:i + chunk_frames],
+        'y': y[i:i + chunk_frames],
+        'order': order[i:i + chunk_frames],
+        'laps': lap_number[i:i + chunk_frames],
+    } for c, i in enumerate(range(0, len(race_times), chunk_frames))]
+
+    print(f"Rendering {len(race_times)} frames in {len(chunks)} chunks on {workers} workers")
+    if video:
+        with tempfile.TemporaryDirectory() as segment_dir:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                segments = list(pool.map(_render_chunk, [scene] * len(chunks), chunks,
+                                         [segment_dir] * len(chunks), [True] * len(chunks)))
+            segment_list = os.path.join(segment_dir, 'segments.txt')
+            with open(segment_list, 'w') as f:
+                f.writelines(f"file '{segment}'\n" for segment in segments)
+            subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                            '-i', segment_list, '-c', 'copy', output], check=True)
+    else:
+        os.makedirs(output, exist_ok=True)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_render_chunk, [scene] * len(chunks), chunks,
+                          [output] * len(chunks), [False] * len(chunks)))
+    return output
+
+
+def frame_size(value: str):
+    """Parses a WIDTHxHEIGHT frame size for argparse."""
+    try:
+        width, height = (int(v) for v in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got '{value}'")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"width and height must be positive, got '{value}'")
+    return width, height
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Render a race replay to images or video without a display.")
+    parser.add_argument('year', type=int)
+    parser.add_argument('event_name')
+    parser.add_argument('output', help="A directory for PNG frames, or a video file such as replay.mp4")
+    parser.add_argument('--start', type=float, default=0.0, help="Race time of the first frame in seconds")
+    parser.add_argument('--end', type=float, default=None, help="Race time of the last frame in seconds")
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--speed', type=float, default=1.0, help="Race seconds per second of output")
+    parser.add_argument('--size', type=frame_size, default=(1280, 720), help="Frame size as WIDTHxHEIGHT")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    if args.fps <= 0:
+        parser.error("--fps must be positive")
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    frame_width, frame_height = args.size
+    result = render_replay(args.year, args.event_name, args.output, start=args.start, end=args.end,
+                           fps=args.fps, speed=args.speed, width=frame_width, height=frame_height,
+                           workers=args.workers)
+    if result:
+        print(f"Replay written to {result}")
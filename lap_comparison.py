@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+
+GRID_POINTS = 1000  # Samples per lap on the shared distance grid
+
+LapKey = Tuple[int, str, str, int]  # (year, event name, driver abbreviation, lap number)
+
+
+class ResampledLap:
+    """A single lap resampled onto a fraction-of-lap distance grid."""
+
+    def __init__(self, telemetry: pd.DataFrame, grid: np.ndarray):
+        telemetry = telemetry.dropna(subset=['Time', 'Distance']).sort_values('Time')
+        t = telemetry['Time'].dt.total_seconds().to_numpy(dtype=float)
+        t = t - t[0]
+        d = np.maximum.accumulate(telemetry['Distance'].to_numpy(dtype=float))
+        d = d - d[0]
+
+        self.length = float(d[-1])
+        self.lap_time = float(t[-1])
+        # Laps from different years can differ by a few metres, so they are
+        # aligned by fraction of lap rather than absolute distance
+        fraction = d / self.length
+        self.time = np.interp(grid, fraction, t)
+        self.x = np.interp(grid, fraction, telemetry['X'].to_numpy(dtype=float))
+        self.y = np.interp(grid, fraction, telemetry['Y'].to_numpy(dtype=float))
+        self.speed = np.interp(grid, fraction, telemetry['Speed'].to_numpy(dtype=float))
+
+
+class LapCache:
+    """
+    Resampled laps cached by lap key.
+
+    Every lap is resampled once when it is added, so comparing any set of
+    cached laps is plain array arithmetic on the shared grid.
+    """
+
+    def __init__(self, grid_points: int = GRID_POINTS):
+        self.grid = np.linspace(0.0, 1.0, grid_points)
+        self.laps: Dict[LapKey, ResampledLap] = {}
+
+    def __contains__(self, key: LapKey) -> bool:
+        return key in self.laps
+
+    def add(self, key: LapKey, telemetry: pd.DataFrame):
+        """
+        Resamples and caches a lap.
+
+        Args:
+            key: The lap key.
+            telemetry: Telemetry for that lap, with 'Time', 'Distance', 'X', 'Y' and 'Speed'.
+        """
+        self.laps[key] = ResampledLap(telemetry, self.grid)
+
+    def compare(self, keys: List[LapKey]) -> dict:
+        """
+        Aligns cached laps by distance against the first one.
+
+        Args:
+            keys: Lap keys to compare, the first one being the reference lap.
+
+        Returns:
+            A dict with the distance grid in metres of the reference lap, and for
+            each lap its elapsed time, delta to the reference, speed and position
+            at every grid point.
+        """
+        laps = [self.laps[key] for key in keys]
+        times = np.stack([lap.time for lap in laps])
+        deltas = times - times[0]
+        return {
+            'distance': (self.grid * laps[0].length).tolist(),
+            'laps': [{
+                'key': list(key),
+                'lap_time': lap.lap_time,
+                'time': lap.time.tolist(),
+                'delta': delta.tolist(),
+                'speed': lap.speed.tolist(),
+                'x': lap.x.tolist(),
+                'y': lap.y.tolist(),
+            } for key, lap, delta in zip(keys, laps, deltas)]
+        }
+
+    def ghost_positions(self, keys: List[LapKey], lap_time: float) -> List[dict]:
+        """
+        Positions of cached laps a given time after each one started.
+
+        Laps that have already finished stay at the line.
+        """
+        positions = []
+        for key in keys:
+            lap = self.laps[key]
+            positions.append({
+                'key': list(key),
+                'x': float(np.interp(lap_time, lap.time, lap.x)),
+                'y': float(np.interp(lap_time, lap.time, lap.y)),
+                'distance': float(np.interp(lap_time, lap.time, self.grid) * lap.length),
+                'finished': lap_time >= lap.lap_time,
+            })
+        return positions
@@ -0,0 +1,310 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+import race_replay
+
+GRID_STEP = 1.0  # Seconds between samples on the shared race time grid
+MAX_GAP_SECONDS = 5.0  # Widest time gap kept in the index
+MAX_GAP_DISTANCE = 1000.0  # Widest distance gap (metres) kept in the index
+OVERTAKE_HOLD = 5.0  # Seconds a new order must hold to count as an overtake
+
+
+def _seconds(values) -> np.ndarray:
+    """Converts a Timedelta series to float seconds."""
+    return pd.to_timedelta(values).dt.total_seconds().to_numpy(dtype=float)
+
+
+def _intervals(mask: np.ndarray):
+    """
+    Finds runs of True along the last axis of a 2D boolean array.
+
+    Returns:
+        Three arrays (row, start, end) where end is exclusive.
+    """
+    padded = np.pad(mask, ((0, 0), (1, 1))).astype(np.int8)
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return rows, starts, ends
+
+
+def _nanmin(values: np.ndarray) -> Optional[float]:
+    """Smallest non-NaN value, or None if there is none."""
+    values = values[~np.isnan(values)]
+    return float(values.min()) if len(values) else None
+
+
+class ProximityIndex:
+    """
+    Gaps between every pair of drivers over a whole race, computed once.
+
+    Each driver's telemetry is resampled onto a shared time grid. At every
+    grid step the drivers are sorted by race distance and each car is compared
+    with the cars ahead of it, one place further per pass. A car drops out of
+    the sweep at a grid step as soon as the car k places ahead is out of range,
+    so after the first pass over all drivers × steps the cost follows the
+    number of close (pair, step) cells rather than drivers² × samples.
+    """
+
+    def __init__(self, driver_telemetry: Dict[str, pd.DataFrame], laps: Optional[pd.DataFrame] = None,
+                 step: float = GRID_STEP, max_gap_seconds: float = MAX_GAP_SECONDS,
+                 max_gap_distance: float = MAX_GAP_DISTANCE):
+        """
+        Args:
+            driver_telemetry: Telemetry per driver number, with 'Time', 'Distance', 'X' and 'Y'.
+            laps: The session laps, used for lap numbers and to ignore pit stops.
+            step: Spacing of the time grid in seconds.
+            max_gap_seconds: Time gaps above this are not stored.
+            max_gap_distance: Distance gaps above this are not stored.
+        """
+        self.step = step
+        self.max_gap_seconds = max_gap_seconds
+        self.max_gap_distance = max_gap_distance
+
+        self.drivers = []
+        samples = []
+        for driver_number, telemetry in driver_telemetry.items():
+            if telemetry.empty or not {'Time', 'Distance', 'X', 'Y'}.issubset(telemetry.columns):
+                continue
+            telemetry = telemetry.dropna(subset=['Time', 'Distance']).drop_duplicates(subset='Time')
+            if len(telemetry) < 2:
+                continue
+            self.drivers.append(driver_number)
+            samples.append(telemetry.sort_values('Time'))
+
+        end_time = max((_seconds(t['Time'])[-1] for t in samples), default=0.0)
+        self.times = np.arange(0.0, end_time + step, step)
+        self._build_tracks(samples, laps)
+        self._build_gaps()
+
+    def _build_tracks(self, samples: List[pd.DataFrame], laps: Optional[pd.DataFrame]):
+        """Resamples distance and position onto the grid and marks pit stops."""
+        shape = (len(samples), len(self.times))
+        self.distance = np.full(shape, np.nan)
+        self.x = np.full(shape, np.nan)
+        self.y = np.full(shape, np.nan)
+        self.in_pit = np.zeros(shape, dtype=bool)
+        self._sample_times = []
+        self._sample_distances = []
+        self._lap_ends = []
+
+        raw_distances = []
+        for i, telemetry in enumerate(samples):
+            t = _seconds(telemetry['Time'])
+            # Integrated distance can dip slightly on noisy speed samples
+            raw_distances.append(np.maximum.accumulate(telemetry['Distance'].to_numpy(dtype=float)))
+            self._sample_times.append(t)
+
+            lap_ends = np.array([])
+            if laps is not None and not laps.empty:
+                offset = race_replay.session_time_offset(telemetry).total_seconds()
+                driver_laps = laps[laps['DriverNumber'] == self.drivers[i]].sort_values('LapNumber')
+                lap_ends = _seconds(driver_laps['Time']) - offset
+                pit_in = _seconds(driver_laps['PitInTime']) - offset
+                pit_out = _seconds(driver_laps['PitOutTime']) - offset
+                # A stop starts on one lap's PitInTime and ends on the next lap's PitOutTime
+                for start, end in zip(pit_in[:-1], pit_out[1:]):
+                    if np.isnan(start) or np.isnan(end):
+                        continue
+                    lo, hi = np.searchsorted(self.times, [start, end])
+                    self.in_pit[i, lo:hi + 1] = True
+            self._lap_ends.append(lap_ends)
+
+        lap_length = self._lap_length(raw_distances)
+        for i, telemetry in enumerate(samples):
+            t = self._sample_times[i]
+            d = raw_distances[i]
+            if lap_length is not None:
+                d = self._anchor_distance(i, d, lap_length)
+            self._sample_distances.append(d)
+
+            self.distance[i] = np.interp(self.times, t, d, left=np.nan, right=np.nan)
+            self.x[i] = np.interp(self.times, t, telemetry['X'].to_numpy(dtype=float), left=np.nan, right=np.nan)
+            self.y[i] = np.interp(self.times, t, telemetry['Y'].to_numpy(dtype=float), left=np.nan, right=np.nan)
+
+    def _lap_boundaries(self, driver: int):
+        """Lap end times of a driver that fall inside their telemetry."""
+        t = self._sample_times[driver]
+        ends = self._lap_ends[driver]
+        return ends[~np.isnan(ends) & (ends > t[0]) & (ends <= t[-1])]
+
+    def _lap_length(self, raw_distances: List[np.ndarray]) -> Optional[float]:
+        """Median integrated length of all completed laps, or None without lap data."""
+        lengths = []
+        for i, t in enumerate(self._sample_times):
+            boundaries = np.concatenate([[t[0]], self._lap_boundaries(i)])
+            lengths.extend(np.diff(np.interp(boundaries, t, raw_distances[i])))
+        lengths = np.array([length for length in lengths if length > 0])
+        return float(np.median(lengths)) if len(lengths) else None
+
+    def _anchor_distance(self, driver: int, d: np.ndarray, lap_length: float) -> np.ndarray:
+        """
+        Re-anchors integrated distance at every lap boundary.
+
+        Speed integrated over a whole race drifts by hundreds of metres, which
+        is enough to swap the order of nearby cars late on. Race distance is
+        rebuilt as completed laps × lap length plus the share of the current
+        lap covered, so the error never carries over from one lap to the next.
+        """
+        t = self._sample_times[driver]
+        ends = self._lap_boundaries(driver)
+        boundary_distance = np.interp(np.concatenate([[t[0]], ends]), t, d)
+        # Integrated length of each completed lap, NaN for the lap still running
+        lengths = np.append(np.diff(boundary_distance), np.nan)
+        completed = np.searchsorted(ends, t, side='right')
+        within = d - boundary_distance[completed]
+        length = lengths[completed]
+        share = np.where(length > 0, within / np.where(length > 0, length, 1.0) * lap_length, within)
+        # The unfinished last lap is not scaled and cannot run past the line
+        share = np.where(np.isnan(length), np.minimum(within, lap_length), share)
+        return np.maximum.accumulate(completed * lap_length + share)
+
+    def _time_to_reach(self, driver: int, distances: np.ndarray, now: np.ndarray) -> np.ndarray:
+        """Seconds until a driver reaches the given distances, measured from `now`."""
+        t, d = self._sample_times[driver], self._sample_distances[driver]
+        return np.interp(distances, d, t, left=np.nan, right=np.nan) - now
+
+    def _build_gaps(self):
+        """Sweeps the per-step distance order and stores gaps for close pairs."""
+        n, steps = self.distance.shape
+        valid = ~np.isnan(self.distance)
+        # Missing drivers sort to the back of the order
+        order = np.argsort(np.where(valid, -self.distance, np.inf), axis=0)
+
+        # Cells still in the sweep, as (position in the order, grid step) of the follower
+        positions, cols = np.nonzero(np.take_along_axis(valid, order, axis=0)[1:])
+        positions += 1
+
+        keys, pair_cols, distance_gaps, time_gaps = [], [], [], []
+        offset = 1
+        while len(positions):
+            leader = order[positions - offset, cols]
+            follower = order[positions, cols]
+            lead_d = self.distance[leader, cols]
+            d_gap = lead_d - self.distance[follower, cols]
+
+            # Group cells by follower so each driver needs one interpolation
+            t_gap = np.empty(len(cols))
+            by_follower = np.argsort(follower, kind='stable')
+            drivers, starts = np.unique(follower[by_follower], return_index=True)
+            for driver, cells in zip(drivers, np.split(by_follower, starts[1:])):
+                t_gap[cells] = self._time_to_reach(driver, lead_d[cells], self.times[cols[cells]])
+
+            close = (d_gap <= self.max_gap_distance) | (t_gap <= self.max_gap_seconds)
+            keys.append(np.minimum(leader[close], follower[close]) * n + np.maximum(leader[close], follower[close]))
+            pair_cols.append(cols[close])
+            distance_gaps.append(d_gap[close])
+            time_gaps.append(t_gap[close])
+
+            # Gaps only grow with offset, so a follower out of range stays out of range
+            offset += 1
+            keep = close & (positions >= offset)
+            positions, cols = positions[keep], cols[keep]
+
+        if keys:
+            unique_keys, pair_index = np.unique(np.concatenate(keys), return_inverse=True)
+        else:
+            unique_keys, pair_index = np.array([], dtype=int), np.array([], dtype=int)
+        self.pairs = np.stack([unique_keys // n, unique_keys % n], axis=1)
+        self.distance_gap = np.full((len(unique_keys), steps), np.nan, dtype=np.float32)
+        self.time_gap = np.full((len(unique_keys), steps), np.nan, dtype=np.float32)
+        if keys:
+            # A pair sits at exactly one offset per grid step, so no cell is written twice
+            cols = np.concatenate(pair_cols)
+            self.distance_gap[pair_index, cols] = np.concatenate(distance_gaps)
+            self.time_gap[pair_index, cols] = np.concatenate(time_gaps)
+
+    def _lap_at(self, driver: int, time: float) -> int:
+        """Lap a driver was on at a given race time."""
+        return int(np.searchsorted(self._lap_ends[driver], time, side='right')) + 1
+
+    def battles(self, max_gap_seconds: Optional[float] = 1.0, max_distance: Optional[float] = None,
+                min_duration: float = 5.0) -> List[dict]:
+        """
+        Finds every interval where two drivers ran within a gap of each other.
+
+        A battle ends when the pair swaps places and a new one starts with
+        the roles reversed, so leader and follower hold for the whole interval.
+        Thresholds above the ones the index was built with are capped to them.
+
+        Args:
+            max_gap_seconds: Time gap that counts as a battle, or None to ignore time.
+            max_distance: Track distance in metres that counts as a battle, or None to ignore distance.
+            min_duration: Shortest interval in seconds to report.
+
+        Returns:
+            A list of battles sorted by start time.
+        """
+        close = np.zeros(self.time_gap.shape, dtype=bool)
+        if max_gap_seconds is not None:
+            close |= self.time_gap <= min(max_gap_seconds, self.max_gap_seconds)
+        if max_distance is not None:
+            close |= self.distance_gap <= min(max_distance, self.max_gap_distance)
+
+        a_ahead = self.distance[self.pairs[:, 0]] >= self.distance[self.pairs[:, 1]]
+        battles = []
+        for first_leads in (True, False):
+            rows, starts, ends = _intervals(close & (a_ahead == first_leads))
+            keep = (ends - starts) * self.step >= min_duration
+            battles.extend(self._battle(row, start, end, first_leads)
+                           for row, start, end in zip(rows[keep], starts[keep], ends[keep]))
+        battles.sort(key=lambda b: b['start_time'])
+        return battles
+
+    def _battle(self, row: int, start: int, end: int, first_leads: bool) -> dict:
+        """Describes one battle interval of a pair."""
+        a, b = self.pairs[row]
+        if not first_leads:
+            a, b = b, a
+        return {
+            'leader': self.drivers[a],
+            'follower': self.drivers[b],
+            'start_time': float(self.times[start]),
+            'end_time': float(self.times[end - 1]),
+            'min_gap_seconds': _nanmin(self.time_gap[row, start:end]),
+            'min_gap_distance': _nanmin(self.distance_gap[row, start:end]),
+            'lap': self._lap_at(a, self.times[start]),
+        }
+
+    def overtakes(self, hold: float = OVERTAKE_HOLD) -> List[dict]:
+        """
+        Finds every on-track change of order between two drivers.
+
+        Passes made while either driver is in the pits are ignored, as are
+        swaps that are undone within `hold` seconds.
+
+        Returns:
+            A list of overtakes sorted by time, with the position where each happened.
+        """
+        if not len(self.pairs):
+            return []
+        a, b = self.pairs[:, 0], self.pairs[:, 1]
+        ahead = np.sign(self.distance[a] - self.distance[b])
+        ahead[np.isnan(ahead) | self.in_pit[a] | self.in_pit[b]] = 0
+        rows, cols = np.nonzero(ahead[:, :-1] * ahead[:, 1:] < 0)
+
+        hold_steps = hold / self.step
+        overtakes = []
+        i = 0
+        while i < len(rows):
+            # A swap undone by the same pair straight away is side-by-side running
+            if i + 1 < len(rows) and rows[i + 1] == rows[i] and cols[i + 1] - cols[i] < hold_steps:
+                i += 2
+                continue
+            row, col = rows[i], cols[i] + 1
+            passer, passed = self.pairs[row]
+            if ahead[row, col] < 0:
+                passer, passed = passed, passer
+            overtakes.append({
+                'driver': self.drivers[passer],
+                'overtaken': self.drivers[passed],
+                'time': float(self.times[col]),
+                'x': float(self.x[passer, col]),
+                'y': float(self.y[passer, col]),
+                'distance': float(self.distance[passer, col]),
+                'lap': self._lap_at(passer, self.times[col]),
+            })
+            i += 1
+        overtakes.sort(key=lambda o: o['time'])
+        return overtakes
@@ -0,0 +1,137 @@
+import fastf1.plotting
+import pandas as pd
+import math
+
+TRACK_WIDTH = 250  # Adjust this value to change the track width
+SCREEN_MARGIN = 200  # Space kept free around the track on screen
+
+
+def load_driver_telemetry(session, sample_step: int = 5) -> dict:
+    """
+    Loads the whole-race telemetry of every driver in a session.
+
+    Args:
+        session: A loaded fastf1 Session.
+        sample_step: Only every sample_step-th sample is kept.
+
+    Returns:
+        A dict of telemetry DataFrames keyed by driver number.
+    """
+    driver_telemetry = {}
+    for driver_number in session.drivers:
+        try:
+            laps = session.laps.pick_driver(driver_number)
+            telemetry = laps.get_telemetry().add_distance()
+            if not telemetry.empty:
+                driver_telemetry[driver_number] = telemetry.iloc[::sample_step].copy()
+        except Exception:
+            pass
+    return driver_telemetry
+
+
+def create_track_boundaries(session, track_width: float = TRACK_WIDTH):
+    """
+    Creates two boundary lines for the track from the fastest lap.
+
+    Returns:
+        A (left, right) tuple of point lists, both empty if no lap is available.
+    """
+    track_left_boundary = []
+    track_right_boundary = []
+    try:
+        fastest_lap = session.laps.pick_fastest()
+        if fastest_lap is not None:
+            telemetry = fastest_lap.get_telemetry().add_distance()
+            points = list(zip(telemetry['X'], telemetry['Y']))
+            for i in range(len(points)):
+                p1 = points[i]
+                p2 = points[(i + 1) % len(points)]
+
+                # Calculate direction vector
+                dx = p2[0] - p1[0]
+                dy = p2[1] - p1[1]
+
+                # Normalize direction vector
+                length = math.sqrt(dx**2 + dy**2)
+                if length > 0:
+                    dx /= length
+                    dy /= length
+
+                # Calculate perpendicular vector
+                perp_dx = -dy
+                perp_dy = dx
+
+                # Calculate boundary points
+                track_left_boundary.append((p1[0] + perp_dx * track_width, p1[1] + perp_dy * track_width))
+                track_right_boundary.append((p1[0] - perp_dx * track_width, p1[1] - perp_dy * track_width))
+    except Exception as e:
+        print(f"Error creating track boundaries: {e}")
+        return [], []
+    return track_left_boundary, track_right_boundary
+
+
+def screen_transform(x_min, x_max, y_min, y_max, width: int, height: int):
+    """
+    Fits the track bounds onto a screen of the given size.
+
+    Returns:
+        A (scale, offset_x, offset_y) tuple.
+    """
+    if x_max > x_min and y_max > y_min:
+        scale = min((width - SCREEN_MARGIN) / (x_max - x_min), (height - SCREEN_MARGIN) / (y_max - y_min))
+    else:
+        scale = 1
+    offset_x = (width - (x_max - x_min) * scale) / 2
+    offset_y = (height - (y_max - y_min) * scale) / 2
+    return scale, offset_x, offset_y
+
+
+def closest_sample(telemetry: pd.DataFrame, race_time: pd.Timedelta) -> pd.Series:
+    """Returns the telemetry sample closest to a race time."""
+    time_diff = (telemetry['Time'] - race_time).abs()
+    return telemetry.loc[time_diff.idxmin()]
+
+
+def session_time_offset(telemetry: pd.DataFrame) -> pd.Timedelta:
+    """
+    Returns how far telemetry 'Time' lags session time.
+
+    Lap timings such as laps['Time'] are session times, while telemetry
+    'Time' starts at zero at the start of the race, so lap timings are
+    shifted back by this offset before comparing them to race times.
+    """
+    if 'SessionTime' not in telemetry.columns or telemetry.empty:
+        return pd.Timedelta(0)
+    return telemetry['SessionTime'].iloc[0] - telemetry['Time'].iloc[0]
+
+
+def lap_number_at(laps: pd.DataFrame, race_time: pd.Timedelta) -> int:
+    """Returns the number of the last lap completed before a race time, or 1."""
+    current_laps = laps[laps['Time'] < race_time]
+    return current_laps.iloc[-1]['LapNumber'] if not current_laps.empty else 1
+
+
+def driver_standings(session, driver_telemetry: dict, race_time: pd.Timedelta) -> list:
+    """
+    Orders the drivers by distance covered at a race time.
+
+    Returns:
+        A list of dicts with driver_number, distance and lap_number, leader first.
+    """
+    driver_positions = []
+    for driver_number, telemetry in driver_telemetry.items():
+        if 'Time' not in telemetry.columns: continue
+
+        distance = closest_sample(telemetry, race_time)['Distance']
+        offset = session_time_offset(telemetry)
+        lap_number = lap_number_at(session.laps.pick_driver(driver_number), race_time + offset)
+        driver_positions.append({'driver_number': driver_number, 'distance': distance, 'lap_number': lap_number})
+
+    driver_positions.sort(key=lambda x: x['distance'], reverse=True)
+    return driver_positions
+
+
+def team_color(session, driver_number) -> str:
+    """Returns a driver's team color as a hex string."""
+    driver = session.get_driver(driver_number)
+    return fastf1.plotting.get_team_color(driver['TeamName'], session=session) or "#FFFFFF"
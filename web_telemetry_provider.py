@@ -1,10 +1,22 @@
 import fastf1
 import pandas as pd
 import math
+import threading
+from proximity_index import ProximityIndex
+from lap_comparison import LapCache
 
 class WebTelemetryProvider:
     def __init__(self):
         self.sessions = {}
+        self.proximity_indexes = {}
+        # Per-key locks, so concurrent requests load and build each thing only once
+        # without a slow load of one event blocking requests for another
+        self.locks = {}
+        self.locks_guard = threading.Lock()
+        self.lap_cache = LapCache()
+        self.lap_sessions = {}
+        # Lap keys by the (year, event, driver, lap) they were requested with
+        self.lap_keys = {}
 
     def get_years(self):
         return list(range(2025, 2020, -1))
@@ -198,6 +210,128 @@ class WebTelemetryProvider:
             print(f"Error getting lap start time for {year} {event_name}, Lap {lap_number}: {e}")
             return None
 
+    def _lock_for(self, key):
+        with self.locks_guard:
+            return self.locks.setdefault(key, threading.Lock())
+
+    def get_proximity_index(self, year, event_name):
+        session_key = f"{year}_{event_name}"
+        with self._lock_for(('proximity', session_key)):
+            if session_key not in self.proximity_indexes:
+                if session_key not in self.sessions:
+                    race_data = self.get_race_data(year, event_name)
+                    if not race_data:
+                        return None
+                session = self.sessions[session_key]
+                self.proximity_indexes[session_key] = ProximityIndex(session.driver_telemetry, session.laps)
+            return self.proximity_indexes[session_key]
+
+    def _driver_abbreviation(self, session, driver_number):
+        try:
+            return session.get_driver(driver_number)['Abbreviation']
+        except Exception:
+            return driver_number
+
+    def get_battles(self, year, event_name, max_gap_seconds=1.0, max_distance=None, min_duration=5.0):
+        try:
+            index = self.get_proximity_index(year, event_name)
+            if index is None:
+                return None
+            session = self.sessions[f"{year}_{event_name}"]
+            battles = index.battles(max_gap_seconds, max_distance, min_duration)
+            for battle in battles:
+                battle['leader_abbreviation'] = self._driver_abbreviation(session, battle['leader'])
+                battle['follower_abbreviation'] = self._driver_abbreviation(session, battle['follower'])
+            return battles
+        except Exception as e:
+            print(f"Error finding battles for {year} {event_name}: {e}")
+            return None
+
+    def get_overtakes(self, year, event_name):
+        try:
+            index = self.get_proximity_index(year, event_name)
+            if index is None:
+                return None
+            session = self.sessions[f"{year}_{event_name}"]
+            overtakes = index.overtakes()
+            for overtake in overtakes:
+                overtake['abbreviation'] = self._driver_abbreviation(session, overtake['driver'])
+                overtake['overtaken_abbreviation'] = self._driver_abbreviation(session, overtake['overtaken'])
+            return overtakes
+        except Exception as e:
+            print(f"Error finding overtakes for {year} {event_name}: {e}")
+            return None
+
+    def _get_lap_session(self, year, event_name):
+        session_key = f"{year}_{event_name}"
+        # A session already loaded for the replay has everything a single lap needs
+        if session_key in self.sessions:
+            return self.sessions[session_key]
+        if session_key not in self.lap_sessions:
+            try:
+                session = fastf1.get_session(year, event_name, 'R')
+                session.load(telemetry=True)
+                self.lap_sessions[session_key] = session
+            except Exception as e:
+                print(f"Error loading session for lap comparison {year} {event_name}: {e}")
+                return None
+        return self.lap_sessions[session_key]
+
+    def _get_lap_key(self, year, event_name, driver, lap_number):
+        # Laps requested before, by driver number, abbreviation or 'fastest',
+        # are served from the cache without the session
+        lap_number = lap_number if lap_number == 'fastest' else int(lap_number)
+        requested = (int(year), event_name, str(driver).upper(), lap_number)
+        if requested in self.lap_keys:
+            return self.lap_keys[requested]
+
+        # Concurrent requests for the same event load its session and resample each lap once
+        with self._lock_for(('laps', f"{year}_{event_name}")):
+            if requested in self.lap_keys:
+                return self.lap_keys[requested]
+
+            session = self._get_lap_session(year, event_name)
+            if session is None:
+                return None
+
+            laps = session.laps.pick_driver(str(driver).upper())
+            if lap_number == 'fastest':
+                lap = laps.pick_fastest()
+            else:
+                matching_laps = laps[laps['LapNumber'] == int(lap_number)]
+                lap = matching_laps.iloc[0] if not matching_laps.empty else None
+            if lap is None:
+                return None
+
+            key = (int(year), event_name, lap['Driver'], int(lap['LapNumber']))
+            if key not in self.lap_cache:
+                telemetry = lap.get_telemetry().add_distance()
+                if telemetry.empty:
+                    return None
+                self.lap_cache.add(key, telemetry)
+            self.lap_keys[requested] = key
+            return key
+
+    def compare_laps(self, lap_specs):
+        try:
+            keys = [self._get_lap_key(*spec) for spec in lap_specs]
+            if not keys or None in keys:
+                return None
+            return self.lap_cache.compare(keys)
+        except Exception as e:
+            print(f"Error comparing laps {lap_specs}: {e}")
+            return None
+
+    def get_ghost_positions(self, lap_specs, lap_time):
+        try:
+            keys = [self._get_lap_key(*spec) for spec in lap_specs]
+            if not keys or None in keys:
+                return None
+            return self.lap_cache.ghost_positions(keys, lap_time)
+        except Exception as e:
+            print(f"Error getting ghost positions for {lap_specs}: {e}")
+            return None
+
 if __name__ == '__main__':
     provider = WebTelemetryProvider()
     print("Testing WebTelemetryProvider...")